@@ -1,5 +1,5 @@
 # adgm_checklist.py
-import re
+from enum import IntEnum
 
 # Example sample checklist for company incorporation (can be extended)
 COMPANY_INCORPORATION_CHECKLIST = [
@@ -17,12 +17,38 @@ ADGM_CITATIONS = {
     "ubo_regulation": "ADGM UBO Rules (example placeholder)",
 }
 
+# Issue severity; ordered so issues can be sorted/compared as plain ints
+class Severity(IntEnum):
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+
+    @property
+    def label(self):
+        # display form used in the UI and JSON report, e.g. "High"
+        return self.name.title()
+
+# Red-flag markers, matched against lowercased text with plain substring search
+# (str.find / `in` use CPython's fast search; an IGNORECASE regex is far slower).
+_JURIS_FEDERAL_MARKERS = ("u.a.e federal courts", "federal courts of the uae")
+_JURIS_CLAUSE_MARKERS = ("jurisdiction", "governing law")
+_SIGNATURE_MARKERS = ("signature", "signed", "authorized signatory")
+_AMBIG_MARKERS = ("may", "best efforts", "endeavour to", "possibly", "subject to", "to the extent possible")
+
+def _contains_any(text, markers):
+    for marker in markers:
+        if marker in text:
+            return True
+    return False
+
 # Heuristic doc-type detection (very simple)
 def detect_doc_type_by_text(text: str) -> str:
     txt = text.lower()
-    if "articles of association" in txt or "article" in txt and "association" in txt:
+    # "articles of association" / "memorandum of association" are covered by the
+    # shorter keyword tests, so only those are searched
+    if "article" in txt and "association" in txt:
         return "Articles of Association"
-    if "memorandum of association" in txt or "memorandum" in txt:
+    if "memorandum" in txt:
         return "Memorandum of Association"
     if "board resolution" in txt:
         return "Board Resolution Template"
@@ -38,46 +64,85 @@ def detect_doc_type_by_text(text: str) -> str:
     return "Unknown"
 
 # Utility functions for rule-based red-flag detection
-def check_jurisdiction_paragraph(paragraph_text: str):
+def _federal_courts_issue():
+    return {
+        "issue": "References UAE Federal Courts instead of ADGM jurisdiction.",
+        "severity": Severity.HIGH,
+        "citation_key": "companies_regulation_jurisdiction",
+        "suggestion": "Replace jurisdiction clause to reference ADGM Courts/Jurisdiction."
+    }
+
+def _missing_adgm_issue():
+    return {
+        "issue": "Jurisdiction clause does not explicitly reference ADGM.",
+        "severity": Severity.MEDIUM,
+        "citation_key": "companies_regulation_jurisdiction",
+        "suggestion": "Update jurisdiction/governing law clause to specify 'ADGM'."
+    }
+
+def _ambiguity_issue(marker):
+    return {
+        "issue": f"Ambiguous/non-binding language found ('{marker}')",
+        "severity": Severity.LOW,
+        "suggestion": "Consider replacing ambiguous phrasing with clear, binding obligations."
+    }
+
+def check_jurisdiction_paragraph(paragraph_text: str, lower_text: str = None):
     # Look for common non-ADGM jurisdictions and missing ADGM mention
-    lower = paragraph_text.lower()
+    # lower_text: paragraph_text.lower(), if the caller has already computed it
+    lower = paragraph_text.lower() if lower_text is None else lower_text
     issues = []
-    if "u.a.e federal courts" in lower or "federal courts of the uae" in lower:
-        issues.append({
-            "issue": "References UAE Federal Courts instead of ADGM jurisdiction.",
-            "severity": "High",
-            "citation_key": "companies_regulation_jurisdiction",
-            "suggestion": "Replace jurisdiction clause to reference ADGM Courts/Jurisdiction."
-        })
-    if ("adgm" not in lower) and ("jurisdiction" in lower or "governing law" in lower):
-        issues.append({
-            "issue": "Jurisdiction clause does not explicitly reference ADGM.",
-            "severity": "Medium",
-            "citation_key": "companies_regulation_jurisdiction",
-            "suggestion": "Update jurisdiction/governing law clause to specify 'ADGM'."
-        })
+    if _contains_any(lower, _JURIS_FEDERAL_MARKERS):
+        issues.append(_federal_courts_issue())
+    if "adgm" not in lower and _contains_any(lower, _JURIS_CLAUSE_MARKERS):
+        issues.append(_missing_adgm_issue())
     return issues
 
 def detect_missing_signature(paragraphs):
     # heuristic: look for signature lines/blocks
-    joined = "\n".join(paragraphs[-10:]).lower()
-    if ("signature" not in joined) and ("signed" not in joined) and ("authorized signatory" not in joined):
+    if not paragraphs or not _contains_any("\n".join(paragraphs[-10:]).lower(), _SIGNATURE_MARKERS):
         return [{
             "issue": "No signature block or signatory section detected near end of document.",
-            "severity": "High",
+            "severity": Severity.HIGH,
             "suggestion": "Add signatory block with name, designation and date."
         }]
     return []
 
-def detect_ambiguous_language(paragraph_text):
+# Ambiguity is only reported for paragraphs under this many words
+_AMBIG_MAX_WORDS = 200
+
+def _is_short_paragraph(text):
+    # Counts spaces instead of len(text.split()) to avoid building a word list;
+    # n single-spaced words contain n - 1 spaces. Only checked after a marker hit.
+    return text.count(" ") < _AMBIG_MAX_WORDS - 1
+
+def _is_word_char(c):
+    # same notion of a word character as the regex \w
+    return c.isalnum() or c == "_"
+
+def _find_marker(text, markers, whole_word=False):
+    # Leftmost (position, marker) of any of `markers` in lowercased `text`, or None;
+    # on a tie the earlier marker wins, as in a regex alternation.
+    best = None
+    for marker in markers:
+        size = len(marker)
+        # only an occurrence left of the current best can win
+        stop = len(text) if best is None else best[0] + size - 1
+        pos = text.find(marker, 0, stop)
+        while pos != -1 and whole_word and (
+            (pos and _is_word_char(text[pos - 1]))
+            or (pos + size < len(text) and _is_word_char(text[pos + size]))
+        ):
+            pos = text.find(marker, pos + 1, stop)
+        if pos != -1:
+            best = (pos, marker)
+    return best
+
+def detect_ambiguous_language(paragraph_text, lower_text=None):
     # naive detection of non-binding language
-    ambig_markers = ["may", "best efforts", "endeavour to", "possibly", "subject to", "to the extent possible"]
-    lower = paragraph_text.lower()
-    for marker in ambig_markers:
-        if marker in lower and len(lower.split()) < 200:
-            return [{
-                "issue": f"Ambiguous/non-binding language found ('{marker}')",
-                "severity": "Low",
-                "suggestion": "Consider replacing ambiguous phrasing with clear, binding obligations."
-            }]
+    # lower_text: paragraph_text.lower(), if the caller has already computed it
+    lower = paragraph_text.lower() if lower_text is None else lower_text
+    hit = _find_marker(lower, _AMBIG_MARKERS, whole_word=True)
+    if hit and _is_short_paragraph(paragraph_text):
+        return [_ambiguity_issue(hit[1])]
     return []
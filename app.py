@@ -1,11 +1,16 @@
 # app.py
+import pandas as pd
 import streamlit as st
-import json
-import os
+import hashlib
+import io
+import orjson
+import shutil
 import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from adgm_checklist import COMPANY_INCORPORATION_CHECKLIST, detect_doc_type_by_text, ADGM_CITATIONS
-from docx_utils import extract_docx_paragraphs, create_reviewed_docx, summarize_issues
+from adgm_checklist import COMPANY_INCORPORATION_CHECKLIST, ADGM_CITATIONS, Severity
+from docx_utils import ISSUE_FIELDS, analyze_docx, create_reviewed_docx, summarise_for_json
 from pathlib import Path
 
 st.set_page_config(page_title="ADGM Corporate Agent (Prototype)", layout="wide")
@@ -32,45 +37,62 @@ if not uploaded_files:
     st.info("Upload .docx files to begin. Example set: Articles of Association, Memorandum, Board Resolution, UBO form.")
     st.stop()
 
-# Create temp workspace
-workspace = Path(tempfile.mkdtemp(prefix="adgm_agent_"))
-st.write("Working directory:", workspace)
+# Names used for keys, reports and workspace files; a name uploaded more than once gets
+# its upload position as a prefix so files don't overwrite each other on disk.
+name_counts = Counter(f.name for f in uploaded_files)
+docs = [f.name if name_counts[f.name] == 1 else f"{i}_{f.name}" for i, f in enumerate(uploaded_files, 1)]
+st.write(f"Uploaded {len(docs)} files.")
 
-docs = []
-for f in uploaded_files:
-    # save to disk
-    saved_path = workspace / f.name
-    with open(saved_path, "wb") as outf:
-        outf.write(f.getbuffer())
-    docs.append(saved_path)
+# Parse, classify and run red-flag rules for every doc up front (each file is parsed once),
+# straight from the uploaded bytes; nothing is written to disk until reviewed files are requested.
+# Streamlit reruns this script on every widget change, so results are cached on the
+# uploads' names and content digests; the UploadedFile objects themselves are not hashed,
+# and their bytes are only copied out on a cache miss.
+@st.cache_data(show_spinner=False)
+def analyze_uploads(upload_keys, _uploads):
+    names = [name for name, _ in upload_keys]
+    sources = [io.BytesIO(f.getvalue()) for f in _uploads]
+    # Files are independent, so several uploads are analysed on a thread pool. Threads,
+    # not processes: forking the multi-threaded Streamlit server is unsafe, and lxml
+    # releases the GIL while parsing.
+    if len(sources) > 1:
+        with ThreadPoolExecutor() as ex:
+            return list(ex.map(analyze_docx, sources, names))
+    return [analyze_docx(src, name) for src, name in zip(sources, names)]
+
+upload_keys = tuple(
+    (name, hashlib.blake2b(f.getbuffer(), digest_size=16).hexdigest()) for name, f in zip(docs, uploaded_files)
+)
+doc_results = dict(zip(docs, analyze_uploads(upload_keys, uploaded_files)))
 
-st.write(f"Uploaded {len(docs)} files.")
+# Preview toggle runs as a fragment, so ticking it reruns only this widget, not the whole script
+@st.fragment
+def show_preview(name, text_paragraphs):
+    if st.checkbox(f"Show preview paragraphs for {name}", key=f"preview_{name}"):
+        st.write("\n\n".join(text_paragraphs[:20]))
 
 # Parse docs and detect type
 st.header("Document parsing & classification")
 doc_summaries = []
-for p in docs:
-    text_paragraphs = extract_docx_paragraphs(p)
-    detected = detect_doc_type_by_text("\n".join(text_paragraphs))
+for name in docs:
+    text_paragraphs, detected, _ = doc_results[name]
     doc_summaries.append({
-        "filename": p.name,
-        "path": str(p),
+        "filename": name,
         "detected_type": detected,
         "paragraph_count": len(text_paragraphs),
     })
-    st.markdown(f"**{p.name}** — detected type: *{detected}* — paragraphs: {len(text_paragraphs)}")
-    if st.checkbox(f"Show preview paragraphs for {p.name}", key=f"preview_{p.name}"):
-        st.write("\n\n".join(text_paragraphs[:20]))
+    st.markdown(f"**{name}** — detected type: *{detected}* — paragraphs: {len(text_paragraphs)}")
+    show_preview(name, text_paragraphs)
 
 # Checklist verification (example: Company Incorporation)
 st.header("Checklist verification")
 # For demo, assume user tries Company Incorporation process
 process = st.selectbox("Which process are you attempting?", ["Company Incorporation", "Other"])
+missing = []
 if process == "Company Incorporation":
     required = COMPANY_INCORPORATION_CHECKLIST
     st.markdown("**Required documents for Company Incorporation (sample)**")
-    for r in required:
-        st.write(f"- {r}")
+    st.markdown("\n".join(f"- {r}" for r in required))
 
     uploaded_types = [s["detected_type"] for s in doc_summaries]
     present = [r for r in required if r in uploaded_types]
@@ -79,70 +101,99 @@ if process == "Company Incorporation":
     st.success(f"Detected {len(present)} of {len(required)} required documents.")
     if missing:
         st.error("Missing documents:")
-        for m in missing:
-            st.write(f"- {m}")
+        st.markdown("\n".join(f"- {m}" for m in missing))
     else:
         st.success("All required documents appear present.")
 
 # Red flag detection & inline comment generation
 st.header("Analysis & Red-Flag Detection")
-severity_map = {"High": 3, "Medium": 2, "Low": 1}
-
-# Gather all issues across docs
-all_issues = []
-for p in docs:
-    paras = extract_docx_paragraphs(p)
-    # simple rules in summarize_issues wrapper
-    issues = summarize_issues(paras, filename=p.name, check_adgm=True)
-    all_issues.extend(issues)
-    st.write(f"Found {len(issues)} issues in {p.name}")
-
-# Show issues in UI
-if all_issues:
-    st.subheader("Issues (detected)")
-    for idx, issue in enumerate(all_issues, 1):
-        st.markdown(f"**{idx}. [{issue['severity']}] {issue['document']} — {issue['section']}**")
-        st.write(issue["issue"])
-        if "suggestion" in issue:
-            st.info(issue["suggestion"])
-        if "citation_key" in issue:
-            cite = ADGM_CITATIONS.get(issue["citation_key"])
-            if cite:
-                st.caption(f"Citation: {cite}")
-
-# Create reviewed docx with "inline comments" (implemented as appended comment paragraphs near flagged paragraph indices)
-if st.button("Generate Reviewed .docx and JSON report"):
-    timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    reviewed_files = []
-    json_summary = {
-        "process": "Company Incorporation" if process == "Company Incorporation" else "Unknown",
-        "documents_uploaded": len(docs),
-        "required_documents": len(COMPANY_INCORPORATION_CHECKLIST) if process == "Company Incorporation" else None,
-        "missing_documents": missing if process == "Company Incorporation" else [],
-        "issues_found": all_issues,
-    }
-
-    for p in docs:
-        reviewed_path = workspace / f"reviewed_{p.name}"
-        # create reviewed docx with comments appended
-        create_reviewed_docx(p, reviewed_path, all_issues)
-        reviewed_files.append(reviewed_path)
-
-    # Save JSON summary
-    json_path = workspace / f"osint_summary_{timestamp}.json"
-    with open(json_path, "w", encoding="utf-8") as jf:
-        json.dump(json_summary, jf, indent=2)
-
-    st.success("Reviewed files and JSON summary created.")
-    st.write("Download reviewed documents:")
-    for f in reviewed_files:
-        with open(f, "rb") as rf:
-            st.download_button(label=f"Download {f.name}", data=rf.read(), file_name=f.name)
-
-    with open(json_path, "rb") as jf:
-        st.download_button(label="Download JSON summary", data=jf.read(), file_name=json_path.name)
-
-    st.info(f"Workspace: {workspace} (you can zip and submit this folder)")
+
+# Gather all issues across docs (column-oriented: one list per field)
+all_issues = {field: [] for field in ISSUE_FIELDS}
+found_lines = []
+for name in docs:
+    _, _, issues = doc_results[name]
+    for field in ISSUE_FIELDS:
+        all_issues[field].extend(issues[field])
+    found_lines.append(f"- Found {len(issues['issue'])} issues in {name}")
+st.markdown("\n".join(found_lines))
+# Highest severity first; the sort is stable so document order is kept within a level
+order = sorted(range(len(all_issues["severity"])), key=lambda i: -all_issues["severity"][i])
+all_issues = {field: [all_issues[field][i] for i in order] for field in ISSUE_FIELDS}
+issues_df = pd.DataFrame(all_issues, columns=ISSUE_FIELDS)
+
+# Severity caption and display table for the issues (labels, resolved citations).
+# Cached on the issues table so reruns from unrelated widgets skip the formatting.
+@st.cache_data(show_spinner=False)
+def render_issues(issues_df):
+    severity_counts = Counter(Severity(s) for s in issues_df["severity"])
+    caption = " · ".join(f"{sev.label}: {severity_counts[sev]}" for sev in sorted(severity_counts, reverse=True))
+    table = pd.DataFrame({
+        "Severity": [Severity(s).label for s in issues_df["severity"]],
+        "Document": issues_df["document"],
+        "Section": issues_df["section"],
+        "Issue": issues_df["issue"],
+        "Suggestion": issues_df["suggestion"],
+        "Citation": [ADGM_CITATIONS.get(k) for k in issues_df["citation_key"]],
+    })
+    return caption, table
+
+# Issue display and report generation run as a fragment: the button (and the download
+# buttons it reveals) only rerun this section instead of the whole script.
+@st.fragment
+def issues_and_report(issues_df, all_issues, process, missing):
+    # Show issues in UI
+    if not issues_df.empty:
+        st.subheader("Issues (detected)")
+        caption, table = render_issues(issues_df)
+        st.caption(caption)
+        # one table widget instead of several Streamlit elements per issue
+        st.dataframe(table)
+
+    # Create reviewed docx with "inline comments" (implemented as appended comment paragraphs near flagged paragraph indices)
+    if st.button("Generate Reviewed .docx and JSON report"):
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        # Records for the reviewed .docx and JSON report come straight from the columns:
+        # a round-trip through the DataFrame turns a None citation_key into NaN.
+        issue_records = [dict(zip(ISSUE_FIELDS, row)) for row in zip(*(all_issues[field] for field in ISSUE_FIELDS))]
+        # Create temp workspace and save the uploads into it
+        workspace = Path(tempfile.mkdtemp(prefix="adgm_agent_"))
+        saved_paths = []
+        for name, f in zip(docs, uploaded_files):
+            saved_path = workspace / name
+            f.seek(0)
+            with open(saved_path, "wb") as outf:
+                shutil.copyfileobj(f, outf)
+            saved_paths.append(saved_path)
+        json_summary = {
+            "process": "Company Incorporation" if process == "Company Incorporation" else "Unknown",
+            "documents_uploaded": len(docs),
+            "required_documents": len(COMPANY_INCORPORATION_CHECKLIST) if process == "Company Incorporation" else None,
+            "missing_documents": missing,
+            "issues_found": summarise_for_json(issue_records),
+        }
+
+        # create reviewed docx with comments appended; files are independent, so build them concurrently
+        reviewed_files = [workspace / f"reviewed_{p.name}" for p in saved_paths]
+        with ThreadPoolExecutor() as ex:
+            list(ex.map(lambda src, dst: create_reviewed_docx(src, dst, issue_records), saved_paths, reviewed_files))
+
+        # Save JSON summary
+        json_path = workspace / f"osint_summary_{timestamp}.json"
+        json_path.write_bytes(orjson.dumps(json_summary, option=orjson.OPT_INDENT_2, default=str))
+
+        st.success("Reviewed files and JSON summary created.")
+        st.write("Download reviewed documents:")
+        for f in reviewed_files:
+            with open(f, "rb") as rf:
+                st.download_button(label=f"Download {f.name}", data=rf.read(), file_name=f.name)
+
+        with open(json_path, "rb") as jf:
+            st.download_button(label="Download JSON summary", data=jf.read(), file_name=json_path.name)
+
+        st.info(f"Workspace: {workspace} (you can zip and submit this folder)")
+
+issues_and_report(issues_df, all_issues, process, missing)
 
 st.markdown("---")
 st.info("This is a functional prototype. For full production: plug in an embeddings model for RAG, secure the app, and expand rule coverage.")
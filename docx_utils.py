@@ -1,107 +1,188 @@
 # docx_utils.py
 from docx import Document
-from docx.shared import Pt
-from adgm_checklist import check_jurisdiction_paragraph, detect_missing_signature, detect_ambiguous_language
-import re
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from lxml import etree
+from adgm_checklist import (
+    Severity, check_jurisdiction_paragraph, detect_ambiguous_language, detect_doc_type_by_text,
+    detect_missing_signature,
+)
 import os
-import copy
-import json
+import shutil
+import zipfile
+from xml.sax.saxutils import escape as xml_escape, quoteattr
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_BODY = _W_NS + "body"
+_W_P = _W_NS + "p"
+_W_R = _W_NS + "r"
+_W_HYPERLINK = _W_NS + "hyperlink"
+_W_T = _W_NS + "t"
+_W_BR = _W_NS + "br"
+_W_BR_TYPE = _W_NS + "type"
+# run children that contribute fixed text, as in python-docx's Run.text
+_W_RUN_CHARS = {_W_NS + "tab": "\t", _W_NS + "ptab": "\t", _W_NS + "cr": "\n", _W_NS + "noBreakHyphen": "-"}
+
+def _paragraph_text(p):
+    """
+    Return the text of a <w:p> element the way python-docx's Paragraph.text reads it
+    """
+    # Only runs that are direct children of the paragraph or of a hyperlink count.
+    # Text boxes anchored in a run's drawing (which Word writes twice, in mc:Choice
+    # and mc:Fallback) have their own nested paragraphs and are not included.
+    parts = []
+    for child in p.iterchildren(_W_R, _W_HYPERLINK):
+        runs = child.iterchildren(_W_R) if child.tag == _W_HYPERLINK else (child,)
+        for r in runs:
+            for node in r.iterchildren(_W_T, _W_BR, *_W_RUN_CHARS):
+                if node.tag == _W_T:
+                    parts.append(node.text or "")
+                elif node.tag == _W_BR:
+                    # line breaks become newlines; page and column breaks add nothing
+                    if node.get(_W_BR_TYPE, "textWrapping") == "textWrapping":
+                        parts.append("\n")
+                else:
+                    parts.append(_W_RUN_CHARS[node.tag])
+    return "".join(parts)
+
+def iter_docx_paragraphs(path):
+    """
+    Yield non-empty body paragraph texts from .docx (a path or binary file-like object),
+    streaming word/document.xml instead of building a full python-docx Document.
+    """
+    with zipfile.ZipFile(path) as z, z.open("word/document.xml") as fh:
+        for _, elem in etree.iterparse(fh, events=("end",), tag=_W_P):
+            body = elem.getparent()
+            if body is None or body.tag != _W_BODY:
+                # paragraph inside a table/text box; skipped like Document.paragraphs
+                continue
+            text = _paragraph_text(elem).strip()
+            if text:
+                yield text
+            # drop this paragraph and anything before it (tables etc.) from the tree
+            elem.clear()
+            while elem.getprevious() is not None:
+                del body[0]
 
 def extract_docx_paragraphs(path):
     """
-    Return a list of paragraph texts from .docx
+    Return a list of paragraph texts from .docx (a path or binary file-like object)
     """
-    doc = Document(path)
-    paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip() != ""]
-    return paragraphs
+    return list(iter_docx_paragraphs(path))
+
+# Columns of the issue table returned by summarize_issues
+ISSUE_FIELDS = ("document", "section", "issue", "severity", "suggestion", "citation_key")
+
+def _append_issue(issues, document, section, iss, default_severity):
+    issues["document"].append(document)
+    issues["section"].append(section)
+    issues["issue"].append(iss["issue"])
+    issues["severity"].append(iss.get("severity", default_severity))
+    issues["suggestion"].append(iss.get("suggestion"))
+    issues["citation_key"].append(iss.get("citation_key"))
 
 def summarize_issues(paragraphs, filename="docx", check_adgm=True):
     """
-    Apply simple rules across paragraphs and return list of issues with metadata:
-    [
-        {
-            "document": filename,
-            "section": "Paragraph #n or heading",
-            "issue": "...",
-            "severity": "High",
-            "suggestion": "...",
-            "citation_key": "companies_regulation_jurisdiction" (optional)
-        },
-    ]
-    """
-    issues = []
+    Apply simple rules across paragraphs and return the issues column-wise,
+    one equal-length list per field in ISSUE_FIELDS:
+    {
+        "document": [filename, ...],
+        "section": ["Paragraph #n or heading", ...],
+        "issue": ["...", ...],
+        "severity": [Severity.HIGH, ...],
+        "suggestion": ["...", ...],
+        "citation_key": ["companies_regulation_jurisdiction" or None, ...],
+    }
+    """
+    issues = {field: [] for field in ISSUE_FIELDS}
     for idx, p in enumerate(paragraphs):
         if len(p.strip()) == 0:
             continue
+        section = f"Paragraph {idx+1}"
+        # lowercased once and shared by the rules below
+        lower = p.lower()
 
         # Jurisdiction checks
-        j_issues = check_jurisdiction_paragraph(p)
-        for ji in j_issues:
-            rec = {
-                "document": filename,
-                "section": f"Paragraph {idx+1}",
-                "issue": ji["issue"],
-                "severity": ji.get("severity", "Medium"),
-                "suggestion": ji.get("suggestion"),
-                "citation_key": ji.get("citation_key"),
-            }
-            issues.append(rec)
+        for ji in check_jurisdiction_paragraph(p, lower_text=lower):
+            _append_issue(issues, filename, section, ji, Severity.MEDIUM)
 
         # Ambiguity
-        a_issues = detect_ambiguous_language(p)
-        for ai in a_issues:
-            rec = {
-                "document": filename,
-                "section": f"Paragraph {idx+1}",
-                "issue": ai["issue"],
-                "severity": ai.get("severity", "Low"),
-                "suggestion": ai.get("suggestion"),
-            }
-            issues.append(rec)
+        for ai in detect_ambiguous_language(p, lower_text=lower):
+            _append_issue(issues, filename, section, ai, Severity.LOW)
 
     # Missing signature heuristic
     ms = detect_missing_signature(paragraphs)
     for m in ms:
-        rec = {
-            "document": filename,
-            "section": "End of Document",
-            "issue": m["issue"],
-            "severity": m.get("severity", "High"),
-            "suggestion": m.get("suggestion"),
-        }
-        issues.append(rec)
+        _append_issue(issues, filename, "End of Document", m, Severity.HIGH)
 
     # Additional checks can be added here (invalid clauses, incorrect formatting, etc.)
     return issues
 
+def analyze_docx(path, filename=None):
+    """
+    Parse, classify and check a single .docx (a path or binary file-like object;
+    pass `filename` for the latter). Returns (paragraphs, detected_type, issues).
+    """
+    paragraphs = extract_docx_paragraphs(path)
+    detected = detect_doc_type_by_text("\n".join(paragraphs))
+    if filename is None:
+        filename = os.path.basename(path)
+    issues = summarize_issues(paragraphs, filename=filename, check_adgm=True)
+    return paragraphs, detected, issues
+
+def _w_p(text, bold=False, style_id=None):
+    """
+    Return the XML for a single-run <w:p> paragraph
+    """
+    ppr = ""
+    if style_id:
+        ppr = f'<w:pPr><w:pStyle w:val={quoteattr(style_id)}/></w:pPr>'
+    rpr = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    return f'<w:p>{ppr}<w:r>{rpr}<w:t xml:space="preserve">{xml_escape(text)}</w:t></w:r></w:p>'
+
 def create_reviewed_docx(original_path, reviewed_path, issues):
     """
-    Create a reviewed docx by copying original content and appending comment paragraphs
-    near positions where issues were detected. Because python-docx doesn't support native
-    Word comments, we append a clearly-styled paragraph after the flagged paragraph with marker "COMMENT".
+    Create a reviewed docx by copying the original file unchanged and appending a
+    review section on a new page: a heading followed by one numbered entry per issue
+    (document/section, issue text, suggestion and citation key where present).
+    python-docx doesn't support native Word comments, so nothing is inserted next to
+    the flagged paragraphs themselves.
+    `issues` is a list of issue records (dicts keyed by ISSUE_FIELDS).
     """
-    src = Document(original_path)
-    out = Document()
-    # copy all elements while preserving text (styles preserved minimally)
-    for p in src.paragraphs:
-        newp = out.add_paragraph(p.text)
-        # Basic style copying can be extended (font, bold, etc.)
+    # start from a byte copy of the original so its content and formatting are kept as-is
+    shutil.copyfile(original_path, reviewed_path)
+    out = Document(reviewed_path)
     # Append a summary page with issues
     out.add_page_break()
-    out.add_heading("Automated Review Comments / Issues", level=1)
+    # user documents don't always define the built-in heading style
+    if 'Heading 1' in out.styles:
+        out.add_heading("Automated Review Comments / Issues", level=1)
+    else:
+        out.add_paragraph().add_run("Automated Review Comments / Issues").bold = True
+    # Build all issue paragraphs as one WordprocessingML fragment rather than
+    # several add_paragraph/add_run calls per issue.
+    quote_style = out.styles['Intense Quote'].style_id if 'Intense Quote' in out.styles else None
+    parts = []
     for idx, iss in enumerate(issues, 1):
-        para = out.add_paragraph()
-        para.add_run(f"[{idx}] Document: {iss.get('document')} | Section: {iss.get('section')}").bold = True
-        out.add_paragraph(f"Issue: {iss.get('issue')}")
+        parts.append(_w_p(f"[{idx}] Document: {iss.get('document')} | Section: {iss.get('section')}", bold=True))
+        parts.append(_w_p(f"Issue: {iss.get('issue')}"))
         if iss.get("suggestion"):
-            s = out.add_paragraph(f"Suggestion: {iss.get('suggestion')}")
-            s.style = out.styles['Intense Quote'] if 'Intense Quote' in out.styles else s.style
+            parts.append(_w_p(f"Suggestion: {iss.get('suggestion')}", style_id=quote_style))
         if iss.get("citation_key"):
-            c = out.add_paragraph(f"Citation: {iss.get('citation_key')}")
+            parts.append(_w_p(f"Citation: {iss.get('citation_key')}"))
+    frag = parse_xml(f'<w:body {nsdecls("w")}>{"".join(parts)}</w:body>')
+    body = out.element.body
+    sect_pr = body.find(qn("w:sectPr"))
+    for p in list(frag):
+        # paragraphs must stay ahead of the trailing section properties
+        if sect_pr is not None:
+            sect_pr.addprevious(p)
+        else:
+            body.append(p)
     out.save(reviewed_path)
 
 def summarise_for_json(issues):
     """
-    Return JSON-serializable summary for UI and download
+    Return JSON-serializable summary for UI and download from a list of issue records
     """
-    return issues
+    return [{**iss, "severity": Severity(iss["severity"]).label} for iss in issues]